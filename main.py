@@ -6,12 +6,21 @@ Production-ready FastAPI application for redacting sensitive sections from PDF d
 import fitz  # PyMuPDF
 import re
 import os
+import sys
+import json
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Tuple, Optional
-import io
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import List, Dict, Tuple, Optional, NamedTuple
 import logging
+import multiprocessing
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # Configure logging
 logging.basicConfig(
@@ -20,13 +29,91 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class TextSpan(NamedTuple):
+    """A non-empty text span with its coordinates and formatting info"""
+    text: str
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    font: str
+    size: float
+    flags: int
+
+# PyMuPDF does not support concurrent use from multiple threads, so redactions
+# running in the request threadpool take turns; the event loop stays free
+_mupdf_lock = threading.Lock()
+
+# Process pool for parallel page text extraction, started by the app lifespan
+# (or on first large document when the redactor is used without the app)
+_page_scan_pool: Optional[ProcessPoolExecutor] = None
+
+def get_page_scan_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return the shared page-scan process pool, creating it on first use"""
+    global _page_scan_pool
+    if _page_scan_pool is None:
+        # Spawn rather than fork: the server process may already be running threads
+        _page_scan_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _page_scan_pool
+
+def _page_scan_worker_ready() -> int:
+    """Process-pool no-op; running it makes a fresh worker import this module"""
+    return os.getpid()
+
+def start_page_scan_pool(max_workers: int):
+    """
+    Create the page-scan pool and bring up all its workers now, so the first
+    large document does not pay for spawning them while holding _mupdf_lock
+    """
+    pool = get_page_scan_pool(max_workers)
+    # Workers are spawned on demand, one per task submitted while none is idle
+    for future in [pool.submit(_page_scan_worker_ready) for _ in range(max_workers)]:
+        future.result()
+
+def shutdown_page_scan_pool():
+    """Shut down the shared page-scan pool, if any; the next use creates a new one"""
+    global _page_scan_pool
+    if _page_scan_pool is not None:
+        _page_scan_pool.shutdown(wait=False, cancel_futures=True)
+        _page_scan_pool = None
+
+def extract_page_range_blocks(pdf_bytes: bytes, start_page: int, end_page: int) -> List[List[TextSpan]]:
+    """
+    Process-pool worker: extract text blocks for pages [start_page, end_page)
+    Each worker opens its own document since PyMuPDF handles cannot be shared
+    """
+    pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return [
+            redactor.extract_text_blocks_with_coordinates(pdf_doc[page_num])
+            for page_num in range(start_page, end_page)
+        ]
+    finally:
+        pdf_doc.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the redactor and page-scan pool before the first request is accepted"""
+    redactor.warmup()
+    if redactor.parallel_max_workers > 1:
+        start_page_scan_pool(redactor.parallel_max_workers)
+        logger.info("Started page-scan pool with %d worker processes", redactor.parallel_max_workers)
+    try:
+        yield
+    finally:
+        shutdown_page_scan_pool()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="PDF Section Redactor API",
     description="Redact sensitive medical sections from PDF documents using targeted content detection",
     version="4.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for web access
@@ -38,92 +125,207 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class PDFSectionRedactor:
-    def __init__(self):
-        # Define the sections to redact (case-insensitive)
-        self.target_sections = [
-            "Past History",
-            "History", 
-            "Overview Note",
-            "Family History",
-            "History (continued)",
-            "Substance & Sexuality History",
-            "Past Surgical History",
-            "Social History"
-        ]
+# Redaction pattern data, built once at import and shared by every
+# PDFSectionRedactor (including the ones in page-scan worker processes)
+
+def _literal_prefix(pattern: str) -> Optional[str]:
+    """
+    Return the literal text every match of a lowercase pattern starts with,
+    or None if the pattern does not begin with a required literal
+    """
+    if "|" in pattern:
+        return None
+    
+    literal = re.match(r'[a-z]*', pattern).group()
+    # A quantifier on the last letter makes that letter optional
+    if pattern[len(literal):len(literal) + 1] in ("?", "*", "{"):
+        literal = literal[:-1]
+    
+    return literal or None
+
+# Sections whose header may also be written with a trailing colon
+COLON_HEADER_SECTIONS = ["Past Surgical History", "Past History", "Social History"]
+
+def _build_section_patterns(target_sections: List[str]) -> List[Tuple[str, re.Pattern]]:
+    """Compile the header patterns for each target section plus common variations"""
+    section_patterns = []
+    
+    # Add colon detection for problematic sections
+    for section in target_sections:
+        escaped_section = re.escape(section)
         
-        # Add colon detection for problematic sections
-        self.section_patterns = []
-        for section in self.target_sections:
-            escaped_section = re.escape(section)
-            
-            # Original pattern (keep for backward compatibility)
-            original_pattern = re.compile(
-                rf'^{escaped_section}\s*(?:\s+as\s+of\s+\d+/\d+/\d+)?$', 
+        # Original pattern (keep for backward compatibility)
+        original_pattern = re.compile(
+            rf'^{escaped_section}\s*(?:\s+as\s+of\s+\d+/\d+/\d+)?$', 
+            re.IGNORECASE | re.MULTILINE
+        )
+        section_patterns.append((section, original_pattern))
+        
+        # Add colon pattern for specific sections that need it
+        if section in COLON_HEADER_SECTIONS:
+            colon_pattern = re.compile(
+                rf'^{escaped_section}\s*:\s*$', 
                 re.IGNORECASE | re.MULTILINE
             )
-            self.section_patterns.append((section, original_pattern))
-            
-            # Add colon pattern for specific sections that need it
-            if section in ["Past Surgical History", "Past History", "Social History"]:
-                colon_pattern = re.compile(
-                    rf'^{escaped_section}\s*:\s*$', 
-                    re.IGNORECASE | re.MULTILINE
-                )
-                self.section_patterns.append((section, colon_pattern))
-            
-        # Also create patterns for common variations
-        additional_patterns = [
-            (re.compile(r'^History\s*\([^)]*\)\s*$', re.IGNORECASE | re.MULTILINE), "History (continued)"),
-            (re.compile(r'^Family\s+Histor[y]?\s*$', re.IGNORECASE | re.MULTILINE), "Family History"),
-        ]
+            section_patterns.append((section, colon_pattern))
         
-        for pattern, section_name in additional_patterns:
-            self.section_patterns.append((section_name, pattern))
-            
-        # Define known section headers that should stop redaction
-        self.major_section_headers = [
-            "allergies", "immunizations", "implants", "visit list", 
-            "medication list", "procedures", "discharge", "vitals",
-            "treatment team", "documents", "flowsheets", "physical exam",
-            "assessment", "plan", "chief complaint", "hpi", "ros",
-            "review of systems", "labs", "radiology", "pathology",
-            "current medications", "problem list", "orders", "notes",
-            "diagnostic results", "imaging", "consultation", "discharge summary"
-        ]
+    # Also create patterns for common variations
+    additional_patterns = [
+        (re.compile(r'^History\s*\([^)]*\)\s*$', re.IGNORECASE | re.MULTILINE), "History (continued)"),
+        (re.compile(r'^Family\s+Histor[y]?\s*$', re.IGNORECASE | re.MULTILINE), "Family History"),
+    ]
+    
+    for pattern, section_name in additional_patterns:
+        section_patterns.append((section_name, pattern))
+    
+    return section_patterns
+
+# Define the sections to redact (case-insensitive)
+TARGET_SECTIONS = [
+    "Past History",
+    "History", 
+    "Overview Note",
+    "Family History",
+    "History (continued)",
+    "Substance & Sexuality History",
+    "Past Surgical History",
+    "Social History"
+]
+
+SECTION_PATTERNS = _build_section_patterns(TARGET_SECTIONS)
+
+# Combine all header patterns into one alternation tried in list order,
+# so a single match call finds the same section the pattern loop would.
+# Names are interned so every match returns one shared string per section
+# (the variation patterns otherwise carry their own copies).
+_SECTION_NAMES = [sys.intern(section_name) for section_name, _ in SECTION_PATTERNS]
+_SECTION_MEGA = re.compile(
+    "|".join(f"(?P<h{i}>{pattern.pattern})" for i, (_, pattern) in enumerate(SECTION_PATTERNS)),
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Most headers are just the section name, optionally with a colon. Text
+# equal to one ignoring case is an exact header, avoiding the regex.
+# (lower() rather than casefold(): casefold expands ligatures such as
+# "\ufb06" to "st", which the IGNORECASE patterns do not.)
+_EXACT_HEADERS = {section.lower(): sys.intern(section) for section in TARGET_SECTIONS}
+_EXACT_COLON_HEADERS = {section.lower(): sys.intern(section) for section in COLON_HEADER_SECTIONS}
+
+# Every header starts with the first word of a target section (the
+# variation patterns start with "History"/"Family" too), so spans that
+# don't can be rejected before the full header patterns are tried. The gate
+# uses the same IGNORECASE folding as those patterns: str.casefold() differs
+# (e.g. "\u0130"/"\u0131" match "i" under re but not after casefold), and a
+# gate stricter than the patterns would leave sections unredacted.
+_SECTION_FIRST_WORDS = tuple(dict.fromkeys(
+    section.split()[0] for section in TARGET_SECTIONS
+))
+_SECTION_FIRST_WORD_RE = re.compile(
+    "|".join(map(re.escape, _SECTION_FIRST_WORDS)), re.IGNORECASE
+)
+
+# Define known section headers that should stop redaction
+MAJOR_SECTION_HEADERS = [
+    "allergies", "immunizations", "implants", "visit list", 
+    "medication list", "procedures", "discharge", "vitals",
+    "treatment team", "documents", "flowsheets", "physical exam",
+    "assessment", "plan", "chief complaint", "hpi", "ros",
+    "review of systems", "labs", "radiology", "pathology",
+    "current medications", "problem list", "orders", "notes",
+    "diagnostic results", "imaging", "consultation", "discharge summary"
+]
+
+# Tuple form lets str.startswith test every header prefix in one C-level call.
+# Lowercase and dedupe at build time, and drop headers already covered by a
+# shorter prefix (e.g. "discharge summary" by "discharge").
+_major_headers = list(dict.fromkeys(header.lower() for header in MAJOR_SECTION_HEADERS))
+_MAJOR_HEADER_PREFIXES = tuple(
+    header for header in _major_headers
+    if not any(header != other and header.startswith(other) for other in _major_headers)
+)
+
+# Define medical procedure content patterns to detect
+MEDICAL_PROCEDURE_PATTERNS = [
+    r'plan\s+excision',
+    r'plan\s+debridement',
+    r'plan\s+fusion',
+    r'plan\s+surgery',
+    r'plan\s+procedure',
+    r'plan\s+wound',
+    r'currently\s+in\s+surgical\s+shoe',
+    r'cleanses\s+daily',
+    r'applies\s+.*?ointment',
+    r'applies\s+.*?abx',
+    r'dsd\s*$',
+    r'excision\s+and\s+debridement',
+    r'surgical\s+shoe',
+    r'wound\s+care',
+    r'post\s*[-\s]*op',
+    r'follow\s*[-\s]*up'
+]
+
+# Combine procedure patterns into a single alternation so each span is
+# scanned once; the named group that fired maps back to its pattern.
+# Duplicate entries would only add dead alternatives, so drop them.
+_PROCEDURE_INDEX = {
+    f"p{i}": pattern for i, pattern in enumerate(dict.fromkeys(MEDICAL_PROCEDURE_PATTERNS))
+}
+_PROCEDURE_MEGA = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in _PROCEDURE_INDEX.items())
+)
+# Same alternation for newline-joined span text, where $ must match at
+# the end of each span rather than only at the end of the buffer
+_PROCEDURE_MEGA_JOINED = re.compile(_PROCEDURE_MEGA.pattern, re.MULTILINE)
+
+# Every procedure match must contain its pattern's leading literal, so a
+# cheap substring screen can skip the regex for most body text
+_procedure_literals = [_literal_prefix(p) for p in MEDICAL_PROCEDURE_PATTERNS]
+_PROCEDURE_LITERALS = tuple(dict.fromkeys(_procedure_literals)) if all(_procedure_literals) else None
+
+# Define sections that should trigger targeted content detection
+TARGETED_DETECTION_SECTIONS = [
+    "Past Surgical History",
+    "Past History"
+]
+# Set form for membership tests; the list keeps its order for /sections
+_TARGETED_DETECTION_SET = frozenset(TARGETED_DETECTION_SECTIONS)
+
+class PDFSectionRedactor:
+    def __init__(self):
+        # Pattern data is compiled once at import; instances only reference it
+        self.target_sections = TARGET_SECTIONS
+        self.section_patterns = SECTION_PATTERNS
+        self._section_names = _SECTION_NAMES
+        self._section_mega = _SECTION_MEGA
+        self._section_first_word_re = _SECTION_FIRST_WORD_RE
+        self._exact_headers = _EXACT_HEADERS
+        self._exact_colon_headers = _EXACT_COLON_HEADERS
         
-        # Define medical procedure content patterns to detect
-        self.medical_procedure_patterns = [
-            r'plan\s+excision',
-            r'plan\s+debridement',
-            r'plan\s+fusion',
-            r'plan\s+surgery',
-            r'plan\s+procedure',
-            r'plan\s+wound',
-            r'currently\s+in\s+surgical\s+shoe',
-            r'cleanses\s+daily',
-            r'applies\s+.*?ointment',
-            r'applies\s+.*?abx',
-            r'dsd\s*$',
-            r'excision\s+and\s+debridement',
-            r'surgical\s+shoe',
-            r'wound\s+care',
-            r'post\s*[-\s]*op',
-            r'follow\s*[-\s]*up'
-        ]
+        self.major_section_headers = MAJOR_SECTION_HEADERS
+        self._major_header_prefixes = _MAJOR_HEADER_PREFIXES
         
-        # Define sections that should trigger targeted content detection
-        self.targeted_detection_sections = [
-            "Past Surgical History",
-            "Past History"
-        ]
+        self.medical_procedure_patterns = MEDICAL_PROCEDURE_PATTERNS
+        self._procedure_index = _PROCEDURE_INDEX
+        self._procedure_mega = _PROCEDURE_MEGA
+        self._procedure_mega_joined = _PROCEDURE_MEGA_JOINED
+        self._procedure_literals = _PROCEDURE_LITERALS
+        
+        self.targeted_detection_sections = TARGETED_DETECTION_SECTIONS
+        self._targeted_detection_set = _TARGETED_DETECTION_SET
         
         # Detection range (in points) to scan after target sections
         self.detection_range = 75  # Smaller than previous extensions
+        
+        # Documents with at least this many pages have their text extracted
+        # in parallel worker processes; smaller ones are not worth the overhead
+        self.parallel_page_threshold = 20
+        self.parallel_max_workers = min(os.cpu_count() or 1, 4)
     
-    def extract_text_blocks_with_coordinates(self, page) -> List[Dict]:
+    def extract_text_blocks_with_coordinates(self, page) -> List[TextSpan]:
         """Extract text blocks with their coordinates and formatting info"""
-        text_dict = page.get_text("dict")
+        # Skip image blocks: only text spans are used, and "dict" output would
+        # otherwise carry every embedded image's binary content
+        text_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)
         blocks = []
         
         for block in text_dict["blocks"]:
@@ -132,16 +334,14 @@ class PDFSectionRedactor:
                     for span in line["spans"]:
                         text = span["text"].strip()
                         if text:  # Only include non-empty text
-                            blocks.append({
-                                "text": text,
-                                "bbox": span["bbox"],  # (x0, y0, x1, y1)
-                                "font": span["font"],
-                                "size": span["size"],
-                                "flags": span["flags"]
-                            })
+                            x0, y0, x1, y1 = span["bbox"]
+                            blocks.append(TextSpan(
+                                text, x0, y0, x1, y1,
+                                span["font"], span["size"], span["flags"]
+                            ))
         
         # Sort blocks by y-coordinate (top to bottom)
-        blocks.sort(key=lambda x: x["bbox"][1])
+        blocks.sort(key=lambda x: x.y0)
         return blocks
     
     def is_section_header(self, text: str, font_size: float, flags: int) -> Tuple[bool, Optional[str]]:
@@ -152,11 +352,23 @@ class PDFSectionRedactor:
         text = text.strip()
         if not text:
             return False, None
+        
+        if not self._section_first_word_re.match(text):
+            return False, None
             
+        # Plain section names (with a colon where allowed) need no regex
+        text_lower = text.lower()
+        if text_lower.endswith(":"):
+            section_name = self._exact_colon_headers.get(text_lower[:-1].rstrip())
+        else:
+            section_name = self._exact_headers.get(text_lower)
+        if section_name:
+            return True, section_name
+        
         # Check against our target sections
-        for section_name, pattern in self.section_patterns:
-            if pattern.match(text):
-                return True, section_name
+        match = self._section_mega.match(text)
+        if match:
+            return True, self._section_names[int(match.lastgroup[1:])]
                 
         return False, None
     
@@ -166,76 +378,147 @@ class PDFSectionRedactor:
         """
         text_lower = text.strip().lower()
         
-        for pattern in self.medical_procedure_patterns:
-            if re.search(pattern, text_lower):
-                logger.info(f"Found medical procedure content: '{text}' (pattern: {pattern})")
-                return True
+        if self._procedure_literals and not any(
+            literal in text_lower for literal in self._procedure_literals
+        ):
+            return False
+        
+        # Callers only need a yes/no, so stop at the first match
+        match = self._procedure_mega.search(text_lower)
+        if match:
+            pattern = self._procedure_index[match.lastgroup]
+            logger.debug("Found medical procedure content: '%s' (pattern: %s)", text, pattern)
+            return True
         
         return False
     
-    def is_major_section_boundary(self, text: str, block: Dict) -> bool:
+    def is_major_section_boundary(self, text: str, block: TextSpan) -> bool:
         """Determine if this text represents a new major section that should end redaction"""
         text_lower = text.strip().lower()
         
         # Check if this looks like a major section header
-        for section in self.major_section_headers:
-            if text_lower.startswith(section):
-                # Additional checks to ensure it's actually a header
-                if (len(text) < 100 and  # Not too long
-                    not text.endswith(".") and  # Not a sentence
-                    (text.isupper() or text.istitle() or  # Formatted like header
-                     block["size"] >= 10)):  # Reasonable font size
-                    return True
-                    
+        if text_lower.startswith(self._major_header_prefixes):
+            # Additional checks to ensure it's actually a header
+            if (len(text) < 100 and  # Not too long
+                not text.endswith(".") and  # Not a sentence
+                (text.isupper() or text.istitle() or  # Formatted like header
+                 block.size >= 10)):  # Reasonable font size
+                return True
+                
         return False
     
-    def find_targeted_content_in_range(self, page, start_y: float, end_y: float) -> List[Dict]:
+    def find_targeted_content_in_range(self, page, start_y: float, end_y: float,
+                                       blocks: Optional[List[TextSpan]] = None) -> List[TextSpan]:
         """
         Look for medical procedure content in a specific y-coordinate range
+        Pass already-extracted page blocks to avoid re-reading the page text
         """
-        blocks = self.extract_text_blocks_with_coordinates(page)
+        if blocks is None:
+            blocks = self.extract_text_blocks_with_coordinates(page)
         found_content = []
         
-        for block in blocks:
-            block_y = block["bbox"][1]
-            
-            # Check if block is in our detection range
-            if start_y <= block_y <= end_y:
-                if self.is_medical_procedure_content(block["text"]):
-                    found_content.append(block)
-                    logger.info(f"Found targeted content at y={block_y}: '{block['text']}'")
+        # Blocks are sorted by top y, so binary search bounds the detection range
+        lo = bisect_left(blocks, start_y, key=lambda block: block.y0)
+        hi = bisect_right(blocks, end_y, lo=lo, key=lambda block: block.y0)
+        window = blocks[lo:hi]
+        
+        # Scan the window's spans as one newline-joined buffer. A match that
+        # crosses a span boundary only widens the candidate set; each candidate
+        # span is confirmed on its own below.
+        texts = [block.text.strip().lower() for block in window]
+        offsets = []
+        position = 0
+        for text in texts:
+            offsets.append(position)
+            position += len(text) + 1
+        
+        candidates = set()
+        for match in self._procedure_mega_joined.finditer("\n".join(texts)):
+            first = bisect_right(offsets, match.start()) - 1
+            last = bisect_right(offsets, match.end() - 1) - 1
+            candidates.update(range(first, last + 1))
+        
+        for index in sorted(candidates):
+            block = window[index]
+            if self.is_medical_procedure_content(block.text):
+                found_content.append(block)
+                logger.debug("Found targeted content at y=%s: '%s'", block.y0, block.text)
         
         return found_content
     
-    def find_global_section_boundaries_with_targeted_detection(self, pdf_doc) -> List[Dict]:
+    def extract_all_page_blocks(self, pdf_doc, pdf_bytes: Optional[bytes] = None) -> List[List[TextSpan]]:
+        """
+        Extract text blocks for every page, indexed by page number
+        Large documents are split into page ranges scanned in worker processes
+        when the raw PDF bytes are available
+        """
+        page_count = pdf_doc.page_count
+        workers = self.parallel_max_workers
+        
+        if pdf_bytes is not None and workers > 1 and page_count >= self.parallel_page_threshold:
+            chunk = -(-page_count // workers)  # Ceiling division
+            ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+            
+            try:
+                pool = get_page_scan_pool(workers)
+                futures = [
+                    pool.submit(extract_page_range_blocks, pdf_bytes, start, end)
+                    for start, end in ranges
+                ]
+                page_blocks = []
+                for future in futures:
+                    page_blocks.extend(future.result())
+                
+                logger.info("Extracted text from %d pages using %d worker processes", page_count, len(ranges))
+                return page_blocks
+            
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed for memory). A broken pool rejects
+                # all further work, so replace it rather than keep failing.
+                logger.warning("Page-scan pool broke, falling back to sequential: %s", e)
+                shutdown_page_scan_pool()
+            
+            except Exception as e:
+                logger.warning("Parallel page extraction failed, falling back to sequential: %s", e)
+        
+        return [self.extract_text_blocks_with_coordinates(pdf_doc[page_num])
+                for page_num in range(page_count)]
+    
+    def find_global_section_boundaries_with_targeted_detection(
+            self, pdf_doc, page_blocks: Optional[List[List[TextSpan]]] = None) -> List[Dict]:
         """
         Find section boundaries and add targeted content detection
+        page_blocks are the pre-extracted blocks of every page, if available
         """
         all_sections = []
         current_section = None
         section_start_page = None
         section_start_y = None
         
-        for page_num in range(pdf_doc.page_count):
-            page = pdf_doc[page_num]
-            blocks = self.extract_text_blocks_with_coordinates(page)
-            
+        if page_blocks is None:
+            page_blocks = self.extract_all_page_blocks(pdf_doc)
+        
+        for page_num, blocks in enumerate(page_blocks):
             for block in blocks:
-                text = block["text"]
-                bbox = block["bbox"]
+                text = block.text
                 
                 # Check if this is a target section header
                 is_header, section_name = self.is_section_header(
-                    text, block["size"], block["flags"]
+                    text, block.size, block.flags
                 )
                 
                 if is_header:
                     # If we were already in a section, close it with targeted detection
                     if current_section:
-                        extended_end_y = self.apply_targeted_detection(
-                            current_section, section_start_page, section_start_y, 
-                            page_num, bbox[1], pdf_doc
-                        )
+                        # Only some sections get targeted detection; the rest
+                        # end exactly at the new header
+                        if current_section in self._targeted_detection_set:
+                            extended_end_y = self.apply_targeted_detection(
+                                current_section, section_start_page, section_start_y, 
+                                page_num, block.y0, pdf_doc, blocks
+                            )
+                        else:
+                            extended_end_y = block.y0
                         
                         all_sections.append({
                             "section": current_section,
@@ -243,22 +526,25 @@ class PDFSectionRedactor:
                             "start_y": section_start_y,
                             "end_page": page_num,
                             "end_y": extended_end_y,
-                            "original_end_y": bbox[1]
+                            "original_end_y": block.y0
                         })
                     
                     # Start new section
                     current_section = section_name
                     section_start_page = page_num
-                    section_start_y = bbox[1]
+                    section_start_y = block.y0
                     
-                    logger.info(f"Started redacting section '{section_name}' on page {page_num + 1}")
+                    logger.info("Started redacting section '%s' on page %d", section_name, page_num + 1)
                 
                 elif current_section and self.is_major_section_boundary(text, block):
                     # Close current section with targeted detection
-                    extended_end_y = self.apply_targeted_detection(
-                        current_section, section_start_page, section_start_y, 
-                        page_num, bbox[1], pdf_doc
-                    )
+                    if current_section in self._targeted_detection_set:
+                        extended_end_y = self.apply_targeted_detection(
+                            current_section, section_start_page, section_start_y, 
+                            page_num, block.y0, pdf_doc, blocks
+                        )
+                    else:
+                        extended_end_y = block.y0
                     
                     all_sections.append({
                         "section": current_section,
@@ -266,10 +552,10 @@ class PDFSectionRedactor:
                         "start_y": section_start_y,
                         "end_page": page_num,
                         "end_y": extended_end_y,
-                        "original_end_y": bbox[1]
+                        "original_end_y": block.y0
                     })
                     
-                    logger.info(f"Ended redacting section '{current_section}' at '{text}' on page {page_num + 1}")
+                    logger.info("Ended redacting section '%s' at '%s' on page %d", current_section, text, page_num + 1)
                     current_section = None
                     section_start_page = None
                     section_start_y = None
@@ -279,10 +565,13 @@ class PDFSectionRedactor:
             last_page = pdf_doc[pdf_doc.page_count - 1]
             page_height = last_page.rect.height
             
-            extended_end_y = self.apply_targeted_detection(
-                current_section, section_start_page, section_start_y, 
-                pdf_doc.page_count - 1, page_height, pdf_doc
-            )
+            if current_section in self._targeted_detection_set:
+                extended_end_y = self.apply_targeted_detection(
+                    current_section, section_start_page, section_start_y, 
+                    pdf_doc.page_count - 1, page_height, pdf_doc, page_blocks[-1]
+                )
+            else:
+                extended_end_y = page_height
             
             all_sections.append({
                 "section": current_section,
@@ -293,17 +582,19 @@ class PDFSectionRedactor:
                 "original_end_y": page_height
             })
             
-            logger.info(f"Ended redacting section '{current_section}' at end of document")
+            logger.info("Ended redacting section '%s' at end of document", current_section)
         
         return all_sections
     
     def apply_targeted_detection(self, section_name: str, start_page: int, start_y: float, 
-                                end_page: int, original_end_y: float, pdf_doc) -> float:
+                                end_page: int, original_end_y: float, pdf_doc,
+                                page_blocks: Optional[List[TextSpan]] = None) -> float:
         """
         Apply targeted content detection for specific sections
+        page_blocks are the already-extracted blocks of end_page, if available
         """
         # Only apply targeted detection for specific sections
-        if section_name not in self.targeted_detection_sections:
+        if section_name not in self._targeted_detection_set:
             return original_end_y
         
         page = pdf_doc[end_page]
@@ -312,93 +603,171 @@ class PDFSectionRedactor:
         # Define detection range
         detection_end_y = min(original_end_y + self.detection_range, page_height)
         
+        if page_blocks is None:
+            page_blocks = self.extract_text_blocks_with_coordinates(page)
+        
         # Look for medical procedure content in the detection range
-        found_content = self.find_targeted_content_in_range(page, original_end_y, detection_end_y)
+        found_content = self.find_targeted_content_in_range(
+            page, original_end_y, detection_end_y, page_blocks
+        )
         
         if found_content:
             # Find the lowest y-coordinate of found content
-            max_content_y = max(block["bbox"][3] for block in found_content)  # bbox[3] is bottom of text
+            max_content_y = max(block.y1 for block in found_content)  # y1 is bottom of text
             
             # Check if extending would hit a major section boundary
-            blocks = self.extract_text_blocks_with_coordinates(page)
-            for block in blocks:
-                block_y = block["bbox"][1]
-                if original_end_y < block_y < max_content_y + 10:  # Small buffer
-                    if self.is_major_section_boundary(block["text"], block):
-                        logger.info(f"Targeted detection stopped by section boundary: '{block['text']}'")
-                        return original_end_y  # Don't extend past section boundary
+            lo = bisect_right(page_blocks, original_end_y, key=lambda block: block.y0)
+            hi = bisect_left(page_blocks, max_content_y + 10, lo=lo,  # Small buffer
+                             key=lambda block: block.y0)
+            for block in page_blocks[lo:hi]:
+                if self.is_major_section_boundary(block.text, block):
+                    logger.info("Targeted detection stopped by section boundary: '%s'", block.text)
+                    return original_end_y  # Don't extend past section boundary
             
             extended_end_y = max_content_y + 5  # Small buffer below content
-            logger.info(f"Targeted detection extended '{section_name}' from y={original_end_y} to y={extended_end_y}")
+            logger.info("Targeted detection extended '%s' from y=%s to y=%s",
+                        section_name, original_end_y, extended_end_y)
             return extended_end_y
         
         # No targeted content found, use original boundary
         return original_end_y
     
-    def apply_redaction_to_pages(self, pdf_doc, section_info: Dict):
-        """Apply redaction across multiple pages for a single section"""
+    def get_section_redaction_rects(self, pdf_doc, section_info: Dict) -> List[Tuple[int, Tuple]]:
+        """
+        Compute the redaction rectangle on each page a single section covers
+        Returns (page_num, (x0, y0, x1, y1)) pairs
+        """
         start_page = section_info["start_page"]
         end_page = section_info["end_page"]
         start_y = section_info["start_y"]
         end_y = section_info["end_y"]
         section_name = section_info["section"]
         
-        logger.info(f"Redacting section '{section_name}' from page {start_page + 1} to page {end_page + 1}")
+        logger.info("Redacting section '%s' from page %d to page %d", section_name, start_page + 1, end_page + 1)
+        
+        # page.rect builds a new Rect on every access, so read it once per page
+        page_rect = pdf_doc[start_page].rect
+        
+        if start_page == end_page:
+            # Section starts and ends on the same page
+            return [(start_page, (0, start_y, page_rect.width, end_y))]
+        
+        # First page of section - from start_y to bottom
+        page_rects = [(start_page, (0, start_y, page_rect.width, page_rect.height))]
+        
+        # Middle pages - redact entire page
+        for page_num in range(start_page + 1, end_page):
+            page_rect = pdf_doc[page_num].rect
+            page_rects.append((page_num, (0, 0, page_rect.width, page_rect.height)))
+        
+        # Last page of section - from top to end_y
+        page_rects.append((end_page, (0, 0, pdf_doc[end_page].rect.width, end_y)))
         
-        for page_num in range(start_page, end_page + 1):
+        return page_rects
+    
+    @staticmethod
+    def merge_overlapping_rects(rects: List[Tuple]) -> List[Tuple]:
+        """
+        Merge rectangles that share an x-range and overlap or touch vertically
+        Section bands are full-width, so adjacent sections collapse into one rect
+        covering exactly the same area
+        """
+        merged = []
+        for x0, y0, x1, y1 in sorted(rects, key=lambda r: (r[0], r[2], r[1])):
+            if merged:
+                mx0, my0, mx1, my1 = merged[-1]
+                if (mx0, mx1) == (x0, x1) and y0 <= my1:
+                    merged[-1] = (mx0, my0, mx1, max(my1, y1))
+                    continue
+            merged.append((x0, y0, x1, y1))
+        return merged
+    
+    def apply_page_redactions(self, pdf_doc, page_rects: Dict[int, List[Tuple]]):
+        """
+        Redact the given rectangles, applying redactions once per page
+        Each apply_redactions call rewrites the page's whole content stream
+        """
+        for page_num in sorted(page_rects):
             page = pdf_doc[page_num]
-            page_width = page.rect.width
-            page_height = page.rect.height
-            
-            if page_num == start_page and page_num == end_page:
-                # Section starts and ends on the same page
-                rect = fitz.Rect(0, start_y, page_width, end_y)
-            elif page_num == start_page:
-                # First page of section - from start_y to bottom
-                rect = fitz.Rect(0, start_y, page_width, page_height)
-            elif page_num == end_page:
-                # Last page of section - from top to end_y
-                rect = fitz.Rect(0, 0, page_width, end_y)
-            else:
-                # Middle page - redact entire page
-                rect = fitz.Rect(0, 0, page_width, page_height)
             
-            # Add redaction annotation
-            redact_annot = page.add_redact_annot(rect)
-            redact_annot.set_colors(fill=(0, 0, 0))  # Black fill
-            redact_annot.update()
+            # Add redaction annotations; any rect-like tuple is accepted, and
+            # setting the fill here saves a separate set_colors call. No update()
+            # is needed: the annotation is consumed by apply_redactions, never shown.
+            for rect in self.merge_overlapping_rects(page_rects[page_num]):
+                page.add_redact_annot(rect, fill=(0, 0, 0))  # Black fill
             
-            # Apply redaction immediately for this page
             page.apply_redactions()
             
-            logger.info(f"Applied redaction on page {page_num + 1}")
+            logger.info("Applied redaction on page %d", page_num + 1)
+    
+    def collect_page_rects(self, pdf_doc, sections: List[Dict]) -> Dict[int, List[Tuple]]:
+        """
+        Group the redaction rectangles of all given sections by page, so pages
+        shared by several sections are rewritten a single time
+        """
+        page_rects = defaultdict(list)
+        for section_info in sections:
+            for page_num, rect in self.get_section_redaction_rects(pdf_doc, section_info):
+                page_rects[page_num].append(rect)
+        return page_rects
+    
+    def apply_redaction_to_pages(self, pdf_doc, section_info: Dict):
+        """Apply redaction across multiple pages for a single section"""
+        self.apply_page_redactions(pdf_doc, self.collect_page_rects(pdf_doc, [section_info]))
     
     def redact_pdf(self, pdf_bytes: bytes) -> bytes:
-        """Main redaction function with targeted content detection"""
+        """
+        Main redaction function with targeted content detection
+        Safe to call from worker threads; MuPDF work is serialized process-wide
+        """
         try:
-            # Open PDF document
-            pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            
-            # Find all sections to redact with targeted detection
-            sections_to_redact = self.find_global_section_boundaries_with_targeted_detection(pdf_doc)
-            
-            logger.info(f"Found {len(sections_to_redact)} sections to redact")
-            
-            # Apply redactions for each section
-            for section_info in sections_to_redact:
-                self.apply_redaction_to_pages(pdf_doc, section_info)
-            
-            logger.info(f"Completed redaction of {len(sections_to_redact)} sections")
-            
-            # Save redacted PDF
-            output_bytes = pdf_doc.tobytes()
-            pdf_doc.close()
-            
-            return output_bytes
+            # Open PDF document; the context manager closes it even on errors
+            with _mupdf_lock, fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+                # Extract page text once, in parallel for large documents
+                page_blocks = self.extract_all_page_blocks(pdf_doc, pdf_bytes)
+                
+                # Find all sections to redact with targeted detection
+                sections_to_redact = self.find_global_section_boundaries_with_targeted_detection(
+                    pdf_doc, page_blocks
+                )
+                
+                logger.info("Found %d sections to redact", len(sections_to_redact))
+                
+                # Collect every section's rects first, then redact each affected
+                # page once
+                self.apply_page_redactions(
+                    pdf_doc, self.collect_page_rects(pdf_doc, sections_to_redact)
+                )
+                
+                logger.info("Completed redaction of %d sections", len(sections_to_redact))
+                
+                # Save redacted PDF. garbage=1 drops unreferenced objects, which
+                # include the original content streams apply_redactions replaced,
+                # so redacted text cannot be recovered from orphaned objects.
+                # Higher levels also search for duplicate objects, which is
+                # quadratic in the object count and runs under _mupdf_lock.
+                return pdf_doc.tobytes(garbage=1, deflate=True)
             
         except Exception as e:
-            logger.error(f"Error during redaction: {str(e)}")
+            logger.error("Error during redaction: %s", e)
             raise HTTPException(status_code=500, detail=f"Redaction failed: {str(e)}")
+    
+    def warmup(self):
+        """
+        Run a tiny generated PDF through the full redaction path once, so
+        MuPDF's one-time initialisation (fonts, parser, output writer) is not
+        paid by the first real request. Pattern data is already compiled at import.
+        """
+        logger.info("Warming up redactor")
+        
+        with fitz.open() as pdf_doc:
+            page = pdf_doc.new_page()
+            for line_num, text in enumerate(["Past Surgical History", "Plan excision", "Allergies"]):
+                page.insert_text((72, 72 + 20 * line_num), text, fontsize=11)
+            pdf_bytes = pdf_doc.tobytes()
+        
+        self.redact_pdf(pdf_bytes)
+        logger.info("Redactor warm-up complete")
 
 # Initialize the redactor
 redactor = PDFSectionRedactor()
@@ -447,24 +816,26 @@ async def redact_pdf_endpoint(file: UploadFile = File(...)):
     
     # Validate file size (max 50MB)
     max_size = 50 * 1024 * 1024  # 50MB
+    too_large_detail = f"File too large. Max size: {max_size // (1024*1024)}MB"
     
     try:
-        # Read uploaded file
-        pdf_content = await file.read()
+        # Reject from the size recorded while parsing the upload, if known
+        if file.size is not None and file.size > max_size:
+            raise HTTPException(status_code=413, detail=too_large_detail)
+        
+        # Read uploaded file, at most one byte past the limit, so an oversized
+        # upload is never buffered in full and valid ones are held only once
+        pdf_content = await file.read(max_size + 1)
+        if len(pdf_content) > max_size:
+            raise HTTPException(status_code=413, detail=too_large_detail)
         
         if len(pdf_content) == 0:
             raise HTTPException(status_code=400, detail="Uploaded file is empty")
         
-        if len(pdf_content) > max_size:
-            raise HTTPException(
-                status_code=413, 
-                detail=f"File too large. Max size: {max_size // (1024*1024)}MB"
-            )
-        
-        logger.info(f"Processing PDF: {file.filename}, Size: {len(pdf_content)} bytes")
+        logger.info("Processing PDF: %s, Size: %d bytes", file.filename, len(pdf_content))
         
-        # Perform redaction
-        redacted_pdf = redactor.redact_pdf(pdf_content)
+        # Perform redaction off the event loop so other requests keep being served
+        redacted_pdf = await run_in_threadpool(redactor.redact_pdf, pdf_content)
         
         # Generate filename
         original_name = file.filename or "document.pdf"
@@ -483,16 +854,16 @@ async def redact_pdf_endpoint(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error processing {file.filename}: {str(e)}")
+        logger.error("Unexpected error processing %s: %s", file.filename, e)
         raise HTTPException(
             status_code=500, 
             detail="Internal server error occurred during PDF processing"
         )
 
-@app.get("/sections")
-def get_target_sections():
-    """Get detailed information about redaction sections and patterns"""
-    return {
+# The sections payload is fixed for the life of the process, so serialize it
+# once (with the same settings as FastAPI's JSONResponse) instead of per request
+_SECTIONS_PAYLOAD = json.dumps(
+    {
         "target_sections": redactor.target_sections,
         "major_section_boundaries": redactor.major_section_headers,
         "medical_procedure_patterns": redactor.medical_procedure_patterns,
@@ -505,7 +876,15 @@ def get_target_sections():
             "supported_formats": ["PDF"],
             "output_format": "PDF"
         }
-    }
+    },
+    ensure_ascii=False,
+    separators=(",", ":")
+).encode("utf-8")
+
+@app.get("/sections")
+def get_target_sections():
+    """Get detailed information about redaction sections and patterns"""
+    return Response(content=_SECTIONS_PAYLOAD, media_type="application/json")
 
 # Error handlers
 @app.exception_handler(413)
@@ -0,0 +1,42 @@
+"""
+Regression tests for section header detection
+"""
+
+import pytest
+
+from main import PDFSectionRedactor, SECTION_PATTERNS, _SECTION_MEGA, _SECTION_NAMES
+
+redactor = PDFSectionRedactor()
+
+
+def regex_only(text):
+    """Reference result: the combined header patterns with no pre-screens"""
+    text = text.strip()
+    match = _SECTION_MEGA.match(text) if text else None
+    if match:
+        return True, _SECTION_NAMES[int(match.lastgroup[1:])]
+    return False, None
+
+
+@pytest.mark.parametrize("text, section", [
+    ("HİSTORY", "History"),
+    ("hıstory", "History"),
+    ("Socıal History", "Social History"),
+    ("PAST HİSTORY:", "Past History"),
+    ("Famıly Histor", "Family History"),
+])
+def test_dotted_and_dotless_i_headers_are_detected(text, section):
+    # re's IGNORECASE folds U+0130/U+0131 to "i"; str.casefold() does not
+    assert redactor.is_section_header(text, 11, 0) == (True, section)
+
+
+def test_screens_agree_with_header_patterns():
+    # Substituting one non-ASCII character anywhere in a header must give
+    # the same answer with and without the cheap pre-screens
+    headers = {section for section, _ in SECTION_PATTERNS}
+    headers.update(["Family Histor", "History (x)", "Past History:", "Past History as of 1/2/2023"])
+    for header in headers:
+        for position in range(len(header)):
+            for codepoint in range(0x80, 0x2000):
+                text = header[:position] + chr(codepoint) + header[position + 1:]
+                assert redactor.is_section_header(text, 11, 0) == regex_only(text), repr(text)